@@ -1,135 +1,225 @@
 import time
 import requests
-from math import radians, cos, sin, sqrt, atan2
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
 import numpy as np
+from scipy.spatial import cKDTree
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 
 # URL for ADS-B data
 URL = "https://api.adsb.lol/v2/lat/42.3555/lon/-71.0565/dist/50"
 
-def haversine(lat1, lon1, lat2, lon2):
-    """Compute horizontal distance (in miles) between two coordinates."""
-    if None in (lat1, lon1, lat2, lon2):
-        return None
-    R = 3958.8  # Earth radius in miles
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-def extrapolate_position(plane, dt=1):
-    """Extrapolate plane position dt seconds into the future assuming constant speed/heading."""
-    if plane['velocity'] is None or plane['track'] is None:
-        return plane['latitude'], plane['longitude']
-    velocity_mps = plane['velocity'] / 3600.0  # miles per second
-    # Approximate: one degree latitude ~ 69 miles.
-    delta_lat = velocity_mps * cos(radians(plane['track'])) * dt / 69.0
-    delta_lon = velocity_mps * sin(radians(plane['track'])) * dt / (69.0 * cos(radians(plane['latitude'])))
-    new_lat = plane['latitude'] + delta_lat
-    new_lon = plane['longitude'] + delta_lon
-    return new_lat, new_lon
+EARTH_RADIUS_MILES = 3958.8
+
+# One keep-alive session for every poll, so the connection and TLS handshake are reused.
+_SESSION = requests.Session()
+
+# ETag and parsed planes of the last feed payload, so unchanged payloads are not re-parsed.
+_FEED_CACHE = {'etag': None, 'planes': None}
+
+def haversine_batch(lat1, lon1, lat2, lon2):
+    """Vectorized haversine over NumPy arrays of coordinates (in miles); broadcasts like any ufunc."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    sin_dlat = np.sin((lat2 - lat1) * 0.5)
+    sin_dlon = np.sin((lon2 - lon1) * 0.5)
+    a = sin_dlat * sin_dlat + np.cos(lat1) * np.cos(lat2) * sin_dlon * sin_dlon
+    # 2*asin(sqrt(a)) == 2*atan2(sqrt(a), sqrt(1-a)), minus one sqrt and the two-argument atan
+    return (2.0 * EARTH_RADIUS_MILES) * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _as_float(value):
+    """Coerce a feed value to float; missing or non-numeric values (e.g. alt_baro "ground") become NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def planes_to_arrays(aircraft):
+    """
+    Reflow the feed's aircraft records into a structure of contiguous arrays, dropping any
+    record without a usable position, altitude, ground speed or callsign in a single mask.
+    Planes sharing an icao24 collapse onto a single row (last report wins).
+    Altitude is stored as float32: whole feet up to 45,000 ft are exact and the
+    pairwise vertical-separation matrix moves half the bytes.
+    """
+    lat = np.array([_as_float(p.get('lat')) for p in aircraft], dtype=np.float64)
+    lon = np.array([_as_float(p.get('lon')) for p in aircraft], dtype=np.float64)
+    altitude = np.array([_as_float(p.get('alt_baro')) for p in aircraft], dtype=np.float64)
+    velocity = np.array([_as_float(p.get('gs')) for p in aircraft], dtype=np.float64)  # in miles per hour
+    # A missing track key defaults to 0 (due north); an explicit null track becomes NaN and
+    # leaves the plane stationary in the simulation.
+    track = np.array([_as_float(p.get('track', 0)) for p in aircraft], dtype=np.float64)
+    has_callsign = np.array([p.get('flight') is not None for p in aircraft], dtype=bool)
+
+    valid = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(altitude) & np.isfinite(velocity) & has_callsign
+    last_row = {aircraft[i].get('hex', 'N/A'): i for i in np.flatnonzero(valid).tolist()}
+    rows = np.fromiter(last_row.values(), dtype=np.intp, count=len(last_row))
+
+    return {
+        'icao24': list(last_row.keys()),
+        'callsign': [aircraft[i]['flight'] for i in rows.tolist()],
+        'latitude': lat[rows],
+        'longitude': lon[rows],
+        'altitude': altitude[rows].astype(np.float32),
+        'velocity': velocity[rows],
+        'track': track[rows],
+    }
 
 def get_planes_data():
-    """Fetch ADS-B data and return a list of planes with key data."""
+    """Fetch ADS-B data and return the valid planes as a structure of arrays (see planes_to_arrays)."""
     try:
-        response = requests.get(URL)
+        headers = {}
+        if _FEED_CACHE['etag']:
+            headers['If-None-Match'] = _FEED_CACHE['etag']
+        response = _SESSION.get(URL, headers=headers)
+        if response.status_code == 304:
+            # Feed unchanged since the last poll.
+            return _FEED_CACHE['planes']
         if response.status_code != 200:
             print(f"Error fetching data: Status code {response.status_code}")
-            return []
+            return planes_to_arrays([])
         
-        data = response.json()
+        data = orjson.loads(response.content)
         if 'ac' not in data:
             print("Error: 'ac' key not found in response")
-            return []
-        
-        planes = []
-        for plane in data['ac']:
-            lat = plane.get('lat')
-            lon = plane.get('lon')
-            altitude = plane.get('alt_baro', None)
-            velocity = plane.get('gs', None)
-            callsign = plane.get('flight', None)
-            # Skip if any critical value is missing.
-            if None in (lat, lon, altitude, velocity, callsign):
-                continue
-            try:
-                altitude = float(altitude)
-                velocity = float(velocity)
-            except ValueError:
-                continue
+            return planes_to_arrays([])
 
-            track = plane.get('track', 0)
-            plane_data = {
-                'icao24': plane.get('hex', 'N/A'),
-                'latitude': lat,
-                'longitude': lon,
-                'altitude': altitude,
-                'velocity': velocity,  # in miles per hour
-                'callsign': callsign,
-                'track': track
-            }
-            planes.append(plane_data)
+        planes = planes_to_arrays(data['ac'])
+        _FEED_CACHE['etag'] = response.headers.get('ETag')
+        _FEED_CACHE['planes'] = planes
         return planes
 
     except Exception as e:
         print(f"Exception during data fetch: {e}")
-        return []
-
-def simulate_plane_trajectory(plane, simulation_time=60):
-    """Simulate a plane's trajectory over a given number of seconds."""
-    trajectory = []
-    # Create a copy of the plane's state to avoid modifying the original data.
-    current_state = plane.copy()
-    for t in range(simulation_time + 1):
-        trajectory.append({
-            'time': t,
-            'latitude': current_state['latitude'],
-            'longitude': current_state['longitude'],
-            'altitude': current_state['altitude']
-        })
-        new_lat, new_lon = extrapolate_position(current_state, dt=1)
-        current_state['latitude'] = new_lat
-        current_state['longitude'] = new_lon
-    return trajectory
+        return planes_to_arrays([])
+
+def simulate_trajectories(state, simulation_time=60):
+    """
+    Simulate every plane's trajectory at once.
+    Returns (latitudes, longitudes) float32 arrays of shape (num_planes, simulation_time + 1);
+    float32 keeps positions to well under a meter while halving the pairwise distance tensor.
+    Positions are integrated in float64 so rounding does not accumulate along the trajectory.
+    """
+    east, north = _planar_velocity(state)
+    delta_lat = north / 69.0
+    lon_step = east / 69.0
+
+    # Latitude is linear in t; each longitude step scales with 1/cos of the latitude it starts
+    # from, so longitude is a running sum over those latitudes. No per-second loop.
+    steps = np.arange(simulation_time + 1)
+    lat = state['latitude'][:, None] + delta_lat[:, None] * steps
+    lon = np.empty_like(lat)
+    lon[:, 0] = 0.0
+    np.cumsum(lon_step[:, None] / np.cos(np.radians(lat[:, :-1])), axis=1, out=lon[:, 1:])
+    lon += state['longitude'][:, None]
+    return lat.astype(np.float32), lon.astype(np.float32)
+
+def _planar_velocity(state):
+    """East/north velocity components (miles per second); planes without a track are stationary."""
+    speed = state['velocity'] / 3600.0  # miles per second
+    track = np.radians(state['track'])
+    moving = np.isfinite(track)
+    return np.where(moving, speed * np.sin(track), 0.0), np.where(moving, speed * np.cos(track), 0.0)
+
+def candidate_pairs(state, radius, vertical_threshold):
+    """
+    Return index arrays (idx1, idx2), idx1 < idx2 and sorted, of plane pairs that are within
+    radius miles horizontally and vertical_threshold feet vertically (ignoring zero altitudes).
+    Uses a KD-tree over (east, north, scaled altitude) so only nearby pairs are enumerated;
+    the result is a superset which callers refine with exact distances.
+    """
+    altitude = state['altitude']
+    # A zero altitude carries no vertical separation information.
+    active = np.flatnonzero(altitude != 0)
+    if active.size < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    lat = state['latitude'][active]
+    lon = state['longitude'][active]
+    cos_lat = np.cos(np.radians(lat.mean()))
+    # Altitude is scaled so the vertical threshold spans the same distance as the horizontal radius:
+    # any pair inside both limits lies within radius * sqrt(2) in this space.
+    points = np.column_stack([lon * (69.0 * cos_lat), lat * 69.0,
+                              altitude[active] * (radius / vertical_threshold)])
+    pairs = cKDTree(points).query_pairs(r=radius * np.sqrt(2.0), output_type='ndarray')
+    idx1, idx2 = active[pairs[:, 0]], active[pairs[:, 1]]
+    order = np.lexsort((idx2, idx1))
+    return idx1[order], idx2[order]
+
+def conflict_times(state, idx1, idx2, radius):
+    """
+    Solve, for every listed pair at once, the quadratic |d + v*t| = radius under straight-line
+    motion on a locally flat earth. Returns (t_enter, t_exit) arrays bounding the window
+    (seconds from now) in which each pair is within radius miles; NaN if never.
+    """
+    lat, lon = state['latitude'], state['longitude']
+    vx, vy = _planar_velocity(state)
+
+    # Relative position (miles) and velocity (miles per second) of plane idx2 as seen from plane idx1.
+    dx = (lon[idx2] - lon[idx1]) * np.cos(np.radians((lat[idx2] + lat[idx1]) * 0.5)) * 69.0
+    dy = (lat[idx2] - lat[idx1]) * 69.0
+    rvx = vx[idx2] - vx[idx1]
+    rvy = vy[idx2] - vy[idx1]
+
+    A = rvx * rvx + rvy * rvy
+    B = 2.0 * (dx * rvx + dy * rvy)
+    C = dx * dx + dy * dy - radius * radius
+    disc = B * B - 4.0 * A * C
+    root = np.sqrt(np.maximum(disc, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_enter = np.where(disc >= 0, (-B - root) / (2.0 * A), np.nan)
+        t_exit = np.where(disc >= 0, (-B + root) / (2.0 * A), np.nan)
+
+    # Without relative motion the separation never changes.
+    static = A == 0
+    t_enter = np.where(static, np.where(C <= 0, -np.inf, np.nan), t_enter)
+    t_exit = np.where(static, np.where(C <= 0, np.inf, np.nan), t_exit)
+    return t_enter, t_exit
 
-def detect_collisions(trajectories, horizontal_threshold=1.0, vertical_threshold=350):
+def detect_collisions(state, traj_lat, traj_lon, horizontal_threshold=1.0, vertical_threshold=350):
     """
     Check for near-miss collision events between plane pairs over the simulation.
     Thresholds: horizontal_threshold in miles, vertical_threshold in feet.
     """
+    plane_ids = state['icao24']
+    altitude = state['altitude']
+    simulation_time = traj_lat.shape[1] - 1
+
+    # Pairs farther apart than the threshold plus the distance both planes can close over the
+    # simulation can never conflict; the KD-tree skips them without enumerating all N^2 pairs.
+    # Radii are padded so the flat-earth approximations never drop a pair the haversine would flag.
+    max_speed = state['velocity'].max(initial=0.0) / 3600.0  # miles per second
+    closure = horizontal_threshold + 2.0 * max_speed * simulation_time
+    idx1, idx2 = candidate_pairs(state, closure * 1.1, vertical_threshold)
+
+    # Altitude is constant along a trajectory, so the vertical test is per pair, not per time step.
+    vert_dist = np.abs(altitude[idx1] - altitude[idx2])
+    keep = vert_dist <= vertical_threshold
+    idx1, idx2, vert_dist = idx1[keep], idx2[keep], vert_dist[keep]
+
+    # Only pairs whose closed-form conflict window overlaps the simulation need the per-step check.
+    t_enter, t_exit = conflict_times(state, idx1, idx2, horizontal_threshold * 1.1)
+    keep = (t_enter <= simulation_time) & (t_exit >= 0)
+    idx1, idx2, vert_dist = idx1[keep], idx2[keep], vert_dist[keep]
+
+    # Horizontal distance for every candidate pair at every simulated time point.
+    horiz_dist = haversine_batch(traj_lat[idx1], traj_lon[idx1], traj_lat[idx2], traj_lon[idx2])
+    pair_hits, time_hits = np.nonzero(horiz_dist <= horizontal_threshold)
+
     collision_events = []
-    plane_ids = list(trajectories.keys())
-    for i in range(len(plane_ids)):
-        for j in range(i + 1, len(plane_ids)):
-            id1 = plane_ids[i]
-            id2 = plane_ids[j]
-            traj1 = trajectories[id1]
-            traj2 = trajectories[id2]
-            # Check each simulated time point.
-            for t in range(len(traj1)):
-                pos1 = traj1[t]
-                pos2 = traj2[t]
-                horiz_dist = haversine(pos1['latitude'], pos1['longitude'], pos2['latitude'], pos2['longitude'])
-                if pos1['altitude'] and pos2['altitude']:
-                    vert_dist = abs(pos1['altitude'] - pos2['altitude'])
-                else:
-                    vert_dist = None
-                if horiz_dist is not None and vert_dist is not None:
-                    if horiz_dist <= horizontal_threshold and vert_dist <= vertical_threshold:
-                        collision_events.append({
-                            'time': t,
-                            'plane1': id1,
-                            'plane2': id2,
-                            'horizontal_distance': horiz_dist,
-                            'vertical_distance': vert_dist,
-                            'latitude': pos1['latitude'],
-                            'longitude': pos1['longitude']
-                        })
+    for p, t in zip(pair_hits.tolist(), time_hits.tolist()):
+        i, j = idx1[p], idx2[p]
+        collision_events.append({
+            'time': t,
+            'plane1': plane_ids[i],
+            'plane2': plane_ids[j],
+            'horizontal_distance': float(horiz_dist[p, t]),
+            'vertical_distance': float(vert_dist[p]),
+            'latitude': float(traj_lat[i, t]),
+            'longitude': float(traj_lon[i, t])
+        })
     return collision_events
 
 def altitude_to_color(altitude, min_alt=0, max_alt=45000):
@@ -182,6 +272,25 @@ def create_plane_icon(heading):
     
     return icon_x, icon_y
 
+def draw_pooled_labels(ax, pool, labels, **text_kwargs):
+    """
+    Draw (x, y, text) labels by recycling the Text artists in pool, creating new ones only
+    when the pool runs short. ax.clear() detaches artists, so pooled labels are re-attached
+    on reuse and any surplus labels are hidden.
+    """
+    for i, (x, y, text) in enumerate(labels):
+        if i < len(pool):
+            label = pool[i]
+            label.set_position((x, y))
+            label.set_text(text)
+            label.set_visible(True)
+            if label.axes is None:
+                ax.add_artist(label)
+        else:
+            pool.append(ax.text(x, y, text, **text_kwargs))
+    for label in pool[len(labels):]:
+        label.set_visible(False)
+
 def realtime_simulation():
     """Continuously update a live plot of predicted trajectories and collision warnings."""
     plt.ion()  # Enable interactive mode
@@ -220,6 +329,15 @@ def realtime_simulation():
     north_ax.text(0.5, 0.05, 'N', transform=north_ax.transAxes, 
                 ha='center', va='center', fontsize=10, fontweight='bold')
     
+    # Label artists are reused across frames instead of being recreated on every redraw
+    plane_label_pool = []
+    collision_label_pool = []
+
+    # The next snapshot is fetched in the background while the current one is being drawn,
+    # so the HTTP round trip overlaps rendering instead of stalling the loop.
+    fetcher = ThreadPoolExecutor(max_workers=1)
+    pending_fetch = fetcher.submit(get_planes_data)
+
     try:
         iteration = 0
         while True:
@@ -227,18 +345,18 @@ def realtime_simulation():
             start_time = time.time()
             
             # Fetch and process plane data
-            planes = get_planes_data()
-            if not planes:
+            state = pending_fetch.result()
+            pending_fetch = fetcher.submit(get_planes_data)
+            if not state['icao24']:
                 status_text.set_text("No plane data available. Retrying...")
                 plt.pause(1)
                 continue
 
             # Compute trajectories and check for collisions
-            trajectories = {}
-            for plane in planes:
-                trajectories[plane['icao24']] = simulate_plane_trajectory(plane, simulation_time=60)
+            traj_lat, traj_lon = simulate_trajectories(state, simulation_time=60)
 
-            collisions = detect_collisions(trajectories, horizontal_threshold=1.0, vertical_threshold=350)
+            collisions = detect_collisions(state, traj_lat, traj_lon,
+                                           horizontal_threshold=1.0, vertical_threshold=350)
 
             # Clear and update the plot
             ax.clear()
@@ -250,15 +368,9 @@ def realtime_simulation():
             ax.add_feature(cfeature.OCEAN, facecolor='#E0F0FF')
             
             # Calculate map boundaries based on all plane positions
-            all_lats = []
-            all_lons = []
-            for traj_list in trajectories.values():
-                all_lats.extend([point['latitude'] for point in traj_list])
-                all_lons.extend([point['longitude'] for point in traj_list])
-                
-            if all_lats and all_lons:
-                lat_min, lat_max = min(all_lats), max(all_lats)
-                lon_min, lon_max = min(all_lons), max(all_lons)
+            if traj_lat.size:
+                lat_min, lat_max = traj_lat.min(), traj_lat.max()
+                lon_min, lon_max = traj_lon.min(), traj_lon.max()
                 
                 # Add a buffer
                 lat_buffer = (lat_max - lat_min) * 0.2
@@ -269,27 +381,21 @@ def realtime_simulation():
             
             # Create a color map for different planes
             plane_colors = {}
-            for i, plane_id in enumerate(trajectories.keys()):
-                hue = i / len(trajectories)
+            for i, plane_id in enumerate(state['icao24']):
+                hue = i / len(state['icao24'])
                 plane_colors[plane_id] = plt.cm.hsv(hue)
             
             # Plot each plane's trajectory
-            for plane_id, traj in trajectories.items():
-                # Get plane data
-                plane_data = next((p for p in planes if p['icao24'] == plane_id), None)
-                if not plane_data:
-                    continue
-                
+            plane_labels = []
+            for idx, plane_id in enumerate(state['icao24']):
+                lats, lons = traj_lat[idx], traj_lon[idx]
+
                 # Get start and end positions
-                start_lat, start_lon = traj[0]['latitude'], traj[0]['longitude']
-                end_lat, end_lon = traj[-1]['latitude'], traj[-1]['longitude']
-                
-                # Draw trajectory with gradient color based on altitude
-                lats = [point['latitude'] for point in traj]
-                lons = [point['longitude'] for point in traj]
-                
+                start_lat, start_lon = lats[0], lons[0]
+                end_lat, end_lon = lats[-1], lons[-1]
+
                 # Use altitude for color
-                altitude = traj[0]['altitude']
+                altitude = state['altitude'][idx]
                 base_color = altitude_to_color(altitude)
                 
                 # Plot the trajectory line with a gradient alpha
@@ -302,21 +408,24 @@ def realtime_simulation():
                 
                 # Draw a plane icon at current position with correct heading
                 icon_size = 0.02  # Scale factor for the icon
-                icon_x, icon_y = create_plane_icon(plane_data['track'])
+                icon_x, icon_y = create_plane_icon(state['track'][idx])
                 ax.fill(start_lon + np.array(icon_x) * icon_size, 
                         start_lat + np.array(icon_y) * icon_size, 
                         color=base_color, edgecolor='black', linewidth=0.5,
                         transform=ccrs.PlateCarree(), zorder=10)
                 
                 # Add callsign and altitude text near the plane
-                if plane_data['callsign']:
-                    ax.text(start_lon + icon_size, start_lat + icon_size, 
-                            f"{plane_data['callsign'].strip()}\n{int(altitude) if altitude else 'Unknown'} ft", 
-                            fontsize=8, fontweight='bold',
-                            bbox=dict(facecolor='white', alpha=0.7, edgecolor='none', pad=1),
-                            transform=ccrs.PlateCarree(), zorder=11)
-            
+                callsign = state['callsign'][idx]
+                if callsign:
+                    plane_labels.append((start_lon + icon_size, start_lat + icon_size,
+                                         f"{callsign.strip()}\n{int(altitude) if altitude else 'Unknown'} ft"))
+            draw_pooled_labels(ax, plane_label_pool, plane_labels,
+                               fontsize=8, fontweight='bold',
+                               bbox=dict(facecolor='white', alpha=0.7, edgecolor='none', pad=1),
+                               transform=ccrs.PlateCarree(), zorder=11)
+
             # Mark collision events with warning symbols
+            collision_labels = []
             for event in collisions:
                 # Create a starburst warning symbol
                 ax.scatter(event['longitude'], event['latitude'], 
@@ -325,12 +434,13 @@ def realtime_simulation():
                 
                 # Add warning text with countdown
                 time_to_event = event['time']
-                ax.text(event['longitude'], event['latitude'] - 0.02, 
-                        f"COLLISION RISK!\nTime: T-{time_to_event}s\nAlt diff: {int(event['vertical_distance'])} ft", 
-                        color='red', fontsize=9, fontweight='bold', ha='center',
-                        bbox=dict(facecolor='white', alpha=0.9, edgecolor='red', boxstyle='round,pad=0.3'),
-                        transform=ccrs.PlateCarree(), zorder=13)
-            
+                collision_labels.append((event['longitude'], event['latitude'] - 0.02,
+                                         f"COLLISION RISK!\nTime: T-{time_to_event}s\nAlt diff: {int(event['vertical_distance'])} ft"))
+            draw_pooled_labels(ax, collision_label_pool, collision_labels,
+                               color='red', fontsize=9, fontweight='bold', ha='center',
+                               bbox=dict(facecolor='white', alpha=0.9, edgecolor='red', boxstyle='round,pad=0.3'),
+                               transform=ccrs.PlateCarree(), zorder=13)
+
             # Add title and grid
             ax.set_title("Real-time Aircraft Collision Avoidance System\n60-Second Trajectory Prediction", 
                          fontsize=14, fontweight='bold', pad=10)
@@ -343,7 +453,7 @@ def realtime_simulation():
             
             # Update status text
             elapsed = time.time() - start_time
-            status_text.set_text(f"Update #{iteration} | Tracking {len(planes)} aircraft | "
+            status_text.set_text(f"Update #{iteration} | Tracking {len(state['icao24'])} aircraft | "
                                 f"{len(collisions)} potential conflicts detected | "
                                 f"Refresh time: {elapsed:.2f}s")
             
@@ -359,6 +469,8 @@ def realtime_simulation():
         print(f"Error in real-time simulation: {e}")
         plt.ioff()
         plt.close()
+    finally:
+        fetcher.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     print("Starting aircraft collision avoidance visualization...")
@@ -1,24 +1,35 @@
 import os
 import glob
+import hashlib
 import logging
+import numpy as np
 import pandas as pd
-from math import radians, sin, cos, sqrt, atan2
+from math import sin, cos, sqrt, asin, pi
 
 # Set up basic logging configuration.
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+EARTH_RADIUS_MILES = 3958.8
+_DEG2RAD = pi / 180.0
+
+# Column used to carry each CSV's tail number through the combined parquet cache.
+CACHE_TAIL_COLUMN = '_cache_tail'
+
 def haversine(lat1, lon1, lat2, lon2):
     """
     Calculate the great-circle distance between two points on Earth.
     Returns distance in miles.
     """
-    R = 3958.8  # Earth radius in miles
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+    # Degree-to-radian conversion is folded into the constants; 2*asin(sqrt(a)) == 2*atan2(sqrt(a), sqrt(1-a)).
+    sin_dlat = sin((lat2 - lat1) * (_DEG2RAD * 0.5))
+    sin_dlon = sin((lon2 - lon1) * (_DEG2RAD * 0.5))
+    return (2.0 * EARTH_RADIUS_MILES) * asin(sqrt(
+        sin_dlat * sin_dlat + cos(lat1 * _DEG2RAD) * cos(lat2 * _DEG2RAD) * sin_dlon * sin_dlon))
+
+def _csv_cache_key(file_list):
+    """Hash of the CSV paths and modification times; any edited, added or removed CSV changes it."""
+    stamp = str(sorted((path, os.path.getmtime(path)) for path in file_list))
+    return hashlib.md5(stamp.encode()).hexdigest()
 
 class AircraftTracker:
     def __init__(self, folder_path="CSVs"):
@@ -30,12 +41,31 @@ class AircraftTracker:
           - Callsign: tail number / identifier of the aircraft
           - Position: a string in the format "lat,lon"
           - Altitude, Speed, Direction: other flight data
+        Parsed data is cached under <folder_path>/.cache and reused until a CSV changes.
         """
-        self.aircraft_data = {}  # Dictionary mapping tail number to its DataFrame
+        self.aircraft_data = {}  # Tail number -> its DataFrame, always ordered by Timestamp
+        self.timestamps = {}  # Tail number -> sorted Timestamp array, for searchsorted window cuts
+        self.latest_timestamp = None  # Latest Timestamp across all tails, set at load
         file_list = glob.glob(os.path.join(folder_path, "*.csv"))
         if not file_list:
             logging.warning(f"No CSV files found in folder: {folder_path}")
-        
+            return
+
+        # Parsed CSVs are cached as a single parquet file, keyed by the CSV paths and mtimes,
+        # so repeated runs skip CSV tokenization and float parsing entirely.
+        cache_path = os.path.join(folder_path, ".cache", f"{_csv_cache_key(file_list)}.parquet")
+        if os.path.exists(cache_path):
+            try:
+                combined = pd.read_parquet(cache_path)
+                for tail, df in combined.groupby(CACHE_TAIL_COLUMN, sort=False):
+                    self.aircraft_data[tail] = df.drop(columns=CACHE_TAIL_COLUMN)
+                    logging.info(f"Loaded data for tail '{tail}' from cache '{cache_path}' with {len(df)} records.")
+                self._index_timestamps()
+                return
+            except Exception as e:
+                logging.warning(f"Failed to read CSV cache '{cache_path}', re-parsing CSVs: {e}")
+                self.aircraft_data = {}
+
         for file in file_list:
             try:
                 df = pd.read_csv(file)
@@ -46,8 +76,9 @@ class AircraftTracker:
                 df[['lat', 'lon']] = df['Position'].str.split(',', expand=True).astype(float)
                 # Use the Callsign column as our tail number identifier.
                 df['tail_number'] = df['Callsign']
-                # Sort the DataFrame by Timestamp to enable efficient querying.
-                df = df.sort_values('Timestamp')
+                # Sort once at load (stable, fresh RangeIndex) so every consumer can rely on
+                # monotonic timestamps and binary-search instead of re-sorting.
+                df = df.sort_values('Timestamp', kind='mergesort').reset_index(drop=True)
                 # Assume each CSV file is for one aircraft; use the first row's tail number.
                 tail = df.iloc[0]['tail_number']
                 self.aircraft_data[tail] = df
@@ -55,6 +86,34 @@ class AircraftTracker:
             except Exception as e:
                 logging.error(f"Failed to load file '{file}': {e}")
 
+        if self.aircraft_data:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                combined = pd.concat(
+                    [df.assign(**{CACHE_TAIL_COLUMN: tail}) for tail, df in self.aircraft_data.items()]
+                )
+                combined.to_parquet(cache_path, compression="zstd")
+            except Exception as e:
+                logging.warning(f"Failed to write CSV cache '{cache_path}': {e}")
+        self._index_timestamps()
+
+    def _index_timestamps(self):
+        """
+        Keeps each tail's (sorted) Timestamp column as a NumPy array for O(log n) time lookups,
+        and the latest timestamp overall (the max of each sorted array's last element).
+        Any frame that isn't already in Timestamp order (e.g. from an old cache) is sorted
+        here, so every load path hands out sorted histories.
+        """
+        for tail, df in self.aircraft_data.items():
+            if not df['Timestamp'].is_monotonic_increasing:
+                self.aircraft_data[tail] = df.sort_values('Timestamp', kind='mergesort').reset_index(drop=True)
+        self.timestamps = {tail: df['Timestamp'].to_numpy() for tail, df in self.aircraft_data.items()}
+        self.latest_timestamp = max((ts[-1] for ts in self.timestamps.values() if ts.size), default=None)
+
+    def _latest_index(self, tail, query_timestamp):
+        """Position of the tail's last record at or before query_timestamp, or -1 if there is none."""
+        return int(np.searchsorted(self.timestamps[tail], query_timestamp, side='right')) - 1
+
     def get_nearby_aircraft(self, our_tail, query_timestamp):
         """
         Returns a list of dictionaries for aircraft within 5 miles of our aircraft 
@@ -78,12 +137,13 @@ class AircraftTracker:
             logging.error(f"Our aircraft data for tail '{our_tail}' was not found.")
             return []
 
-        # Get the most recent record at or before the query_timestamp.
-        our_rows = our_df[our_df['Timestamp'] <= query_timestamp]
-        if our_rows.empty:
+        # Get the most recent record at or before the query_timestamp: the last index a
+        # binary search puts at or before it, read straight off the sorted frame (no mask, no copy).
+        our_idx = self._latest_index(our_tail, query_timestamp)
+        if our_idx < 0:
             logging.warning(f"No data for our aircraft '{our_tail}' at or before timestamp {query_timestamp}.")
             return []
-        our_row = our_rows.iloc[-1]
+        our_row = our_df.iloc[our_idx]
         our_position = (our_row['lat'], our_row['lon'])
         logging.info(f"Our aircraft '{our_tail}' position at timestamp {query_timestamp}: {our_position}")
 
@@ -93,12 +153,12 @@ class AircraftTracker:
             if tail == our_tail:
                 continue  # Skip our own aircraft
 
-            rows = df[df['Timestamp'] <= query_timestamp]
-            if rows.empty:
+            idx = self._latest_index(tail, query_timestamp)
+            if idx < 0:
                 logging.debug(f"No data for aircraft '{tail}' at or before timestamp {query_timestamp}.")
                 continue
 
-            row = rows.iloc[-1]
+            row = df.iloc[idx]
             distance = haversine(our_position[0], our_position[1], row['lat'], row['lon'])
             print(distance)
             if distance <= 5:
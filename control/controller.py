@@ -2,87 +2,87 @@ from adsb.adsb_manager import AircraftTracker
 from flights import Flights
 from pandas import DataFrame
 
-from features import assimilate_routes, generate_static_features
+from features import load_static_features
 from visualize import build_animated_map
-from geopy.distance import distance
+import numpy as np
+import sys
+from types import MappingProxyType
+
+# Fixed pieces of the incursion report, built once instead of inside every f-string
+REPORT_GUTTER = ":" * 17 + " "
+REPORT_RULE = "-" * 112
+REPORT_BOX_RULE = REPORT_GUTTER + "|" + "-" * 86
+REPORT_ENTRY_RULE = "-" * 18 + "^" + "-" * 93
 
 def guardian_setup(plane_histories, center_lat, center_lon):
-    # Force the start time to align with ATC tower audio timing
-    forced_start = 1740494856 - 15
-    
-    for tail, df in plane_histories.items():
-        plane_histories[tail] = df[(df["Timestamp"] >= forced_start)]
     flights: Flights = Flights()
-
-    southwest_tail = flights.map_flight_identifier("Southwest 2504")
-    arrival_time = None
-    if southwest_tail in plane_histories:
-        for _, row in plane_histories[southwest_tail].sort_values("Timestamp").iterrows():
-            if distance((row["lat"], row["lon"]), (center_lat, center_lon)).meters < 500:
-                arrival_time = row["Timestamp"]
-                break
-        if arrival_time is None:
-            arrival_time = plane_histories[southwest_tail]["Timestamp"].min()
     return flights, plane_histories
 
-def log_violations(incursions: dict):
-    print(f"\nNature of incursions (set length: {len(incursions)}):")
-    print("----------------------------------------------------------------------------------------------------------------")
+def log_violations(incursions: list):
+    lines = [
+        f"\nNature of incursions (set length: {len(incursions)}):",
+        REPORT_RULE,
+    ]
     val: dict
-    for _, val in incursions.items():
-        reason = val.get('message')
-        toi = val.get('timestamp')
-        speed = val.get('speed')
-        heading = val.get('heading')
-        forecast = val.get('interval')
-        recommendation = val.get('advisory')
-        pred_outcome = val.get('prediction')
+    for val in incursions:
+        get = val.get
+        lines.append(f">> {get('message')}\n{REPORT_GUTTER}[ timestamp: {get('timestamp')} • lat/long location: ({get('lat'), get('lon')})")
+        lines.append(f"{REPORT_GUTTER}[ speed: {get('speed')}ms/s • heading: {get('heading')} degrees • path forecast: {get('interval')} seconds")
+        lines.append(REPORT_BOX_RULE)
+        lines.append(f"{REPORT_GUTTER}|     RECOMMENDATION : {get('advisory')}")
+        lines.append(f"{REPORT_GUTTER}|     IF NOT FOLLOWED: {get('prediction')}")
+        lines.append(REPORT_BOX_RULE)
+        lines.append(REPORT_ENTRY_RULE)
+    lines.append("\nInteractive map saved to kmdw_interactive_flight_map.html")
+    # One write for the whole report instead of a print (and a flush) per line
+    sys.stdout.write("\n".join(lines) + "\n")
 
-        print(f">> {reason}\n::::::::::::::::: [ timestamp: {toi} • lat/long location: ({val.get('lat'), val.get('lon')})")
-        print(f"::::::::::::::::: [ speed: {speed}ms/s • heading: {heading} degrees • path forecast: {forecast} seconds")
-        print(f"::::::::::::::::: |--------------------------------------------------------------------------------------")
-        print(f"::::::::::::::::: |     RECOMMENDATION : {recommendation}")
-        print(f"::::::::::::::::: |     IF NOT FOLLOWED: {pred_outcome}")
-        print(f"::::::::::::::::: |--------------------------------------------------------------------------------------")
-        print("------------------^---------------------------------------------------------------------------------------------")
-    print("\nInteractive map saved to kmdw_interactive_flight_map.html")
+# ATC tower instructions: Audio processed through Whisper and transcribed into JSON object for ADS-B referencing
+# Read-only views in a tuple: built once at import, and downstream code cannot mutate them by accident.
+INSTRUCTIONS = (
+    MappingProxyType({"plane": "Southwest 2504", "instr": "CLEARED_TO_LAND", "reference": "31C", "time": 1740494856.48}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "TURN_LEFT", "reference": "04L/22R", "time": 1740494867.06}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "CLEAR_TO_CROSS", "reference": "13C/31C", "time": 1740494867.06}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_SHORT", "reference": "13C/31C", "time": 1740494867.06}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494913.54}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494915.44}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_SHORT", "reference": "H", "time": 1740494919.82}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_SHORT", "reference": "H", "time": 1740494922.54}),
+    MappingProxyType({"plane": "Southwest 2504", "instr": "TURN_LEFT_HEADING", "reference": "220", "time": 1740494932.7}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494939.96}),
+    MappingProxyType({"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494941.3}),
+)
+
+# Columns each plane's history is reduced to after the window cut (one array per column)
+TRACK_COLUMNS = ("lat", "lon", "Direction", "Speed", "Timestamp")
+
+# Force the start time to align with ATC tower audio timing
+FORCED_START = 1740494856 - 15
 
 def main():
-    # ATC tower instructions: Audio processed through Whisper and transcribed into JSON object for ADS-B referencing
-    instructions = [
-        {"plane": "Southwest 2504", "instr": "CLEARED_TO_LAND", "reference": "31C", "time": 1740494856.48},
-        {"plane": "FlexJet 560", "instr": "TURN_LEFT", "reference": "04L/22R", "time": 1740494867.06},
-        {"plane": "FlexJet 560", "instr": "CLEAR_TO_CROSS", "reference": "13C/31C", "time": 1740494867.06},
-        {"plane": "FlexJet 560", "instr": "HOLD_SHORT", "reference": "13C/31C", "time": 1740494867.06},
-        {"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494913.54},
-        {"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494915.44},
-        {"plane": "FlexJet 560", "instr": "HOLD_SHORT", "reference": "H", "time": 1740494919.82},
-        {"plane": "FlexJet 560", "instr": "HOLD_SHORT", "reference": "H", "time": 1740494922.54},
-        {"plane": "Southwest 2504", "instr": "TURN_LEFT_HEADING", "reference": "220", "time": 1740494932.7},
-        {"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494939.96},
-        {"plane": "FlexJet 560", "instr": "HOLD_POSITION", "reference": "", "time": 1740494941.3}
-    ]
-    
     # 1) Load static airport data and process features
-    edges = assimilate_routes()
-    center_lat, center_lon, static_feats = generate_static_features(edges)
+    center_lat, center_lon, static_feats = load_static_features()
     
     # 2) Load ADS-B data for each plane
+    # The tracker hands out Timestamp-sorted histories, which the window cuts below rely on
     tracker = AircraftTracker(folder_path="adsb/csvs")
     plane_histories = {}
-    query_ts = 0
+    query_ts = tracker.latest_timestamp
     for tail, df in tracker.aircraft_data.items():
-        if max(df["Timestamp"]) > query_ts:
-            query_ts = max(df["Timestamp"])
-        subset: DataFrame = df[df["Timestamp"] <= query_ts]
+        # One cut per tail: both window bounds are binary searches on the sorted timestamps.
+        ts = tracker.timestamps[tail]
+        lo = np.searchsorted(ts, FORCED_START, side="left")
+        hi = np.searchsorted(ts, query_ts, side="right")
+        subset: DataFrame = df.iloc[lo:hi]
         if not subset.empty:
-            plane_histories[tail] = subset
+            # Downstream only needs a few numeric columns: hand them over as plain arrays
+            plane_histories[tail] = {col: subset[col].to_numpy() for col in TRACK_COLUMNS}
     
     # 3) Set up guardian system with helper instances and thresholds
     flights, plane_histories = guardian_setup(plane_histories, center_lat, center_lon)
     
     # 4) Log flagged incursions (only the first occurrence per plane/ref)
-    flagged_events = flights.log_flagged_incursions(plane_histories, instructions, static_feats, interval=30)
+    flagged_events = flights.log_flagged_incursions(plane_histories, INSTRUCTIONS, static_feats, interval=30)
         
     # 5) Create and save the interactive map
     folium_map = build_animated_map(
@@ -95,8 +95,7 @@ def main():
     folium_map.save("kmdw_interactive_flight_map.html")
 
     # 6) List incursions within specified filter range
-    FLAGGED_INCURSIONS = flights._getFlaggedIncursions()
-    log_violations(FLAGGED_INCURSIONS)
+    log_violations(flagged_events)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,35 +1,114 @@
 import geopandas as gpd
 import pandas as pd
+import numpy as np
+import shapely
 import osmnx as ox
+from pyproj import Transformer
+import hashlib
+import logging
+import os
+import pickle
+from functools import lru_cache
+
+AIRPORT_CODE = "KMDW"
+OSM_FILTER = (
+    '["aeroway"~"runway|taxiway|apron|control_tower|control_center|gate|hangar|'
+    'helipad|heliport|navigationaid|taxilane|terminal|windsock|highway_strip|'
+    'parking_position|holding_position|airstrip|stopway|tower"]'
+)
+FEATURE_CLASSES = ['runway', 'taxiway']
+# OSM edges and processed static features are cached next to this module (not the working
+# directory); delete the folder to pick up fresh OSM data.
+STATIC_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# Bump whenever generate_static_features (or anything it calls) changes its output, so
+# pickled static features from older code are rebuilt instead of silently reused.
+STATIC_CACHE_VERSION = 2
+# Edge columns anything downstream reads; the rest of the OSM tags are dropped before caching.
+EDGE_COLUMNS = ["ref", "name", "service", "width", "geometry"]
+# Bump whenever the cached edge file changes shape beyond EDGE_COLUMNS (which is keyed on its own).
+EDGE_CACHE_VERSION = 1
+# Metric CRS the buffer widths (meters) are applied in
+METRIC_CRS = 3857
+
+def _osm_cache_key(*parts) -> str:
+    """
+    Hash of the airport code, OSM filter and any extra parts (cache versions, column lists);
+    changing any of them invalidates the cache built with that key.
+    """
+    return hashlib.md5("|".join([AIRPORT_CODE, OSM_FILTER, *map(str, parts)]).encode()).hexdigest()
 
 def assimilate_routes() -> gpd.GeoDataFrame:
-    """Loads airport-related features from OpenStreetMap using a custom filter."""
-    airport_code = "KMDW"
-    osm_filter = (
-        '["aeroway"~"runway|taxiway|apron|control_tower|control_center|gate|hangar|'
-        'helipad|heliport|navigationaid|taxilane|terminal|windsock|highway_strip|'
-        'parking_position|holding_position|airstrip|stopway|tower"]'
-    )
-    graph = ox.graph_from_place(
-        airport_code,
-        simplify=False,
-        retain_all=True,
-        truncate_by_edge=True,
-        custom_filter=osm_filter,
-    )
+    """
+    Loads airport-related features from OpenStreetMap using a custom filter.
+    The edges are kept as a parquet file under STATIC_CACHE_DIR and read back on later runs,
+    keyed on EDGE_COLUMNS and EDGE_CACHE_VERSION as well as the query.
+    """
+    cache_key = _osm_cache_key("edges", EDGE_CACHE_VERSION, *EDGE_COLUMNS)
+    cache_path = os.path.join(STATIC_CACHE_DIR, f"edges_{cache_key}.parquet")
+    if os.path.exists(cache_path):
+        try:
+            return gpd.read_parquet(cache_path)
+        except Exception as e:
+            logging.warning(f"Failed to read OSM edge cache '{cache_path}', downloading: {e}")
+
+    # Keep osmnx's raw Overpass responses alongside our caches, so a rebuild after changing the
+    # processing (not the query) needs no network. The settings are global to osmnx, so they
+    # are only swapped in for this download and restored afterwards.
+    saved_settings = ox.settings.use_cache, ox.settings.cache_folder
+    ox.settings.use_cache = True
+    ox.settings.cache_folder = os.path.join(STATIC_CACHE_DIR, "osmnx")
+    try:
+        graph = ox.graph_from_place(
+            AIRPORT_CODE,
+            simplify=False,
+            retain_all=True,
+            truncate_by_edge=True,
+            custom_filter=OSM_FILTER,
+        )
+    finally:
+        ox.settings.use_cache, ox.settings.cache_folder = saved_settings
     _, edges = ox.graph_to_gdfs(graph)
+    edges = edges[[column for column in EDGE_COLUMNS if column in edges.columns]]
+    try:
+        os.makedirs(STATIC_CACHE_DIR, exist_ok=True)
+        edges.to_parquet(cache_path, compression="zstd")
+    except Exception as e:
+        logging.warning(f"Failed to write OSM edge cache '{cache_path}': {e}")
     return edges
 
+@lru_cache(maxsize=8)
+def _metric_transformers(crs):
+    """
+    (to_metric, from_metric) Transformers between crs and METRIC_CRS, built once per CRS:
+    PROJ pipeline setup costs more than transforming a few hundred airport features.
+    """
+    return (Transformer.from_crs(crs, METRIC_CRS, always_xy=True),
+            Transformer.from_crs(METRIC_CRS, crs, always_xy=True))
+
+def _transform_geometries(geoms: np.ndarray, transformer: Transformer) -> np.ndarray:
+    """Runs every coordinate of geoms through transformer in one bulk call (Shapely 2.0 API)."""
+    return shapely.transform(
+        geoms, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1]))
+    )
+
 def buffer_features(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
-    """Buffers geometries if width data is provided."""
+    """
+    Buffers geometries if width data is provided. Only the rows with a width are
+    projected to EPSG:3857 and back into the frame's own CRS; the rest keep their
+    geometry untouched.
+    """
     if 'width' in gdf.columns and not gdf['width'].isna().all():
-        gdf_proj = gdf.to_crs(epsg=3857)
-        gdf_proj['geometry'] = gdf_proj.apply(
-            lambda row: row.geometry.buffer(float(row.width) / 2, cap_style=3)
-            if pd.notna(row.width) else row.geometry,
-            axis=1
-        )
-        return gdf_proj.to_crs(epsg=4326)
+        if gdf.crs is None:
+            raise ValueError("Cannot buffer features by width without a CRS set on the frame.")
+        to_metric, from_metric = _metric_transformers(gdf.crs)
+        half_widths = pd.to_numeric(gdf['width'], errors='coerce').to_numpy(dtype=float) / 2
+        has_width = ~np.isnan(half_widths)
+        geoms = np.array(gdf.geometry.values)
+        metric = _transform_geometries(geoms[has_width], to_metric)
+        buffered = shapely.buffer(metric, half_widths[has_width], cap_style="square")
+        geoms[has_width] = _transform_geometries(buffered, from_metric)
+        gdf = gdf.copy()
+        gdf['geometry'] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
     return gdf
 
 def generate_static_features(edges: gpd.GeoDataFrame):
@@ -38,22 +117,57 @@ def generate_static_features(edges: gpd.GeoDataFrame):
     the center of the airport area.
     """
     if 'service' in edges.columns and any(s in edges['service'].unique() for s in ['runway', 'taxiway']):
-        runways = edges[edges['service'] == 'runway'].copy()
-        taxiways = edges[edges['service'] == 'taxiway'].copy()
+        is_runway = (edges['service'] == 'runway').to_numpy()
+        is_taxiway = (edges['service'] == 'taxiway').to_numpy()
     else:
         edges['ref'] = edges['ref'].fillna('')
-        runways = edges[edges['ref'].str.contains('/')].copy()
-        taxiways = edges[~edges['ref'].str.contains('/')].copy()
+        # Runway refs pair both ends ("13C/31C"); one literal substring scan classifies every edge
+        is_runway = edges['ref'].str.contains('/', regex=False).to_numpy()
+        is_taxiway = ~is_runway
 
-    runways = buffer_features(runways)
-    taxiways = buffer_features(taxiways)
+    # Tag runways and taxiways with a categorical class column (visualize styles on it), buffer
+    # them together so the projection runs once, then split them back on the class
+    keep = is_runway | is_taxiway
+    features = edges[keep].copy()
+    features['class'] = pd.Categorical(
+        np.where(is_runway[keep], 'runway', 'taxiway'), categories=FEATURE_CLASSES
+    )
+    features = buffer_features(features)
+    runways = features[features['class'] == 'runway']
+    taxiways = features[features['class'] == 'taxiway']
 
+    # Center on the bounding-box midpoint: a min/max over the coordinates, no per-feature centroids
     if not runways.empty:
-        center_lat = runways.geometry.centroid.y.mean()
-        center_lon = runways.geometry.centroid.x.mean()
+        minx, miny, maxx, maxy = runways.total_bounds
+        center_lat, center_lon = (miny + maxy) / 2, (minx + maxx) / 2
     elif not taxiways.empty:
-        center_lat = taxiways.geometry.centroid.y.mean()
-        center_lon = taxiways.geometry.centroid.x.mean()
+        minx, miny, maxx, maxy = taxiways.total_bounds
+        center_lat, center_lon = (miny + maxy) / 2, (minx + maxx) / 2
     else:
         center_lat, center_lon = 41.7868, -87.7522  # Default: Chicago Midway
-    return center_lat, center_lon, [runways, taxiways]
\ No newline at end of file
+    return center_lat, center_lon, [runways, taxiways]
+
+def load_static_features():
+    """
+    Returns (center_lat, center_lon, [runways, taxiways]) for the airport, reusing a
+    pickled copy keyed by the airport code, OSM filter and STATIC_CACHE_VERSION so repeated
+    runs skip both the OSM download and the buffering.
+    """
+    cache_path = os.path.join(
+        STATIC_CACHE_DIR, f"static_features_{_osm_cache_key('static', STATIC_CACHE_VERSION)}.pkl"
+    )
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Failed to read static feature cache '{cache_path}', rebuilding: {e}")
+
+    result = generate_static_features(assimilate_routes())
+    try:
+        os.makedirs(STATIC_CACHE_DIR, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logging.warning(f"Failed to write static feature cache '{cache_path}': {e}")
+    return result
@@ -1,8 +1,80 @@
+import shapely
 from shapely.geometry import LineString
 from typing import List, Dict
 import geopandas as gpd
-import pandas as pd
+import numpy as np
+from geo_kernels import forward_geodesic
 import logging
+from functools import lru_cache
+from bisect import bisect_right
+
+# (ATC flight name, ADS-B tail identifier) pairs, tried in order as substring matches
+FLIGHT_IDENTIFIERS = (
+    ("Southwest 2504", "SWA2504"),
+    ("FlexJet 560",    "LXJ560"),
+)
+
+@lru_cache(maxsize=256)
+def map_flight_identifier(flight_name: str) -> str:
+    """
+    Maps an ATC flight name to its ADS-B tail identifier, or returns it unchanged.
+    Memoized: the compliance check resolves the same few names for every record.
+    """
+    for key, ident in FLIGHT_IDENTIFIERS:
+        if key in flight_name:
+            return ident
+    return flight_name
+
+# Below this many fixes NumPy's per-call overhead is smaller than a trip into the Numba kernel
+FORWARD_GEODESIC_MIN_JIT = 32
+
+def project_position_vec(lat, lon, heading_deg, speed, dt_sec):
+    """
+    Vectorized Flights.project_position: predicts positions for whole arrays of
+    lat/lon/heading/speed at once with the spherical forward-geodesic formula.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    heading_deg = np.asarray(heading_deg, dtype=np.float64)
+    speed = np.asarray(speed, dtype=np.float64)
+    if lat.size > FORWARD_GEODESIC_MIN_JIT:
+        new_lat, new_lon = np.empty_like(lat), np.empty_like(lon)
+        forward_geodesic(lat, lon, heading_deg, speed, float(dt_sec), new_lat, new_lon)
+        return new_lat, new_lon
+
+    R = 6371000  # Earth radius in meters
+    angular = speed * dt_sec / R
+    heading_rad = np.radians(heading_deg)
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    sin_lat, cos_lat = np.sin(lat_rad), np.cos(lat_rad)
+    sin_ang, cos_ang = np.sin(angular), np.cos(angular)
+
+    new_lat_rad = np.arcsin(sin_lat * cos_ang + cos_lat * sin_ang * np.cos(heading_rad))
+    new_lon_rad = lon_rad + np.arctan2(
+        np.sin(heading_rad) * sin_ang * cos_lat,
+        cos_ang - sin_lat * np.sin(new_lat_rad)
+    )
+    return np.degrees(new_lat_rad), np.degrees(new_lon_rad)
+
+def build_instruction_index(instructions: List[Dict]) -> Dict[str, tuple]:
+    """
+    Groups instructions by ADS-B tail into time-sorted timelines: {tail: (times, instructions)}.
+    The sort is stable, so instructions sharing a timestamp keep their issued order, and
+    bisect_right(times, t) gives how many had been issued by time t.
+    """
+    index = {}
+    for instr in sorted(instructions, key=lambda x: x["time"]):
+        times, plane_instr = index.setdefault(map_flight_identifier(instr["plane"]), ([], []))
+        times.append(instr["time"])
+        plane_instr.append(instr)
+    return index
+
+def _bbox_overlaps(bounds, minx, miny, maxx, maxy) -> bool:
+    """Whether (minx, miny, maxx, maxy) overlaps the bounds tuple; four compares, no GEOS call."""
+    return not (maxx < bounds[0] or minx > bounds[2] or maxy < bounds[1] or miny > bounds[3])
+
+HOLD_COMMANDS = {"HOLD_POSITION", "HOLD_SHORT"}
 
 class Flights:
     def __init__(self):
@@ -15,31 +87,39 @@ class Flights:
         self.logger.addHandler(handler)
         self.logger.setLevel(logging.FATAL)
 
-        FLAGGED_INCURSIONS = {}
-        self.FLAGGED_INCURSIONS = FLAGGED_INCURSIONS
-
         self.interval = 30
-    
-    def _getFlaggedIncursions(self):
-        return self.FLAGGED_INCURSIONS
 
+        # Static feature lookups, built on first use by _feature_index
+        self._indexed_features = None
+        self._ref_geometries = {}
+        self._hold_zones = {}
+        self._hold_zone_bounds = {}  # ref -> (minx, miny, maxx, maxy) of its hold zone
+    
     def map_flight_identifier(self, flight_name: str) -> str:
         """
         Maps an ATC flight name to its ADS-B tail identifier.
         Adjust mapping as needed.
         """
-        logger = self.logger
-        logger.debug(f"map_flight_identifier called with flight_name={flight_name}")
-        mapping = {
-            "Southwest 2504": "SWA2504",
-            "FlexJet 560":    "LXJ560"
-        }
-        for key, ident in mapping.items():
-            if key in flight_name:
-                logger.debug(f"match found: {key} -> {ident}")
-                return ident
-        logger.debug(f"no mapping found, returning original flight_name={flight_name}")
-        return flight_name
+        self.logger.debug(f"map_flight_identifier called with flight_name={flight_name}")
+        return map_flight_identifier(flight_name)
+
+    def _feature_index(self, static_features: List[gpd.GeoDataFrame]) -> Dict[str, object]:
+        """
+        Returns {ref: geometry} for the static feature layers, built once per feature
+        list (the first feature carrying a ref wins, matching the old linear scan).
+        Rebuilding also drops the buffered hold zones derived from the previous list.
+        """
+        if self._indexed_features is not static_features:
+            index = {}
+            for group in static_features:
+                refs = group["ref"].tolist() if "ref" in group.columns else [""] * len(group)
+                for candidate, geometry in zip(refs, group.geometry):
+                    index.setdefault(str(candidate).strip(), geometry)
+            self._ref_geometries = index
+            self._hold_zones = {}
+            self._hold_zone_bounds = {}
+            self._indexed_features = static_features
+        return self._ref_geometries
 
     def get_feature_geometry(self, ref: str, static_features: List[gpd.GeoDataFrame]):
         """
@@ -48,14 +128,25 @@ class Flights:
         """
         logger = self.logger
         logger.debug(f"get_feature_geometry called with ref={ref}")
-        for idx_group, group in enumerate(static_features):
-            for _, row in group.iterrows():
-                candidate_ref = str(row.get("ref", "")).strip()
-                if candidate_ref == ref.strip():
-                    logger.debug(f"match found in group {idx_group}: {candidate_ref}")
-                    return row.geometry
-        logger.debug("no matching feature geometry found.")
-        return None
+        geometry = self._feature_index(static_features).get(ref.strip())
+        if geometry is None:
+            logger.debug("no matching feature geometry found.")
+        return geometry
+
+    def get_hold_zone(self, ref: str, static_features: List[gpd.GeoDataFrame]):
+        """
+        The feature's geometry buffered into the zone a held plane must not enter, cached per
+        ref and prepared, since every fix of a held plane is tested against the same zone.
+        """
+        self._feature_index(static_features)
+        if ref not in self._hold_zones:
+            geometry = self.get_feature_geometry(ref, static_features)
+            zone = geometry.buffer(40) if geometry is not None else None
+            if zone is not None:
+                shapely.prepare(zone)
+                self._hold_zone_bounds[ref] = zone.bounds
+            self._hold_zones[ref] = zone
+        return self._hold_zones[ref]
     
     def recommend_action(self, violation_msg: str) -> Dict[str, str]:
         """
@@ -112,6 +203,51 @@ class Flights:
 
         return new_lat, new_lon
 
+    def _active_hold(self, plane_instr: List[Dict], issued: int):
+        """
+        Given a plane's time-sorted instructions and how many of them have been issued,
+        returns (hold instruction, ref) if an uncleared hold on a named feature is in
+        effect, else None.
+        """
+        if not issued:
+            return None
+        last_instr = plane_instr[issued - 1]
+        if last_instr["instr"] not in HOLD_COMMANDS:
+            return None
+        hold_ref = last_instr["reference"].strip()
+        cleared = [
+            i for i in plane_instr[:issued]
+            if i["instr"] == "CLEAR_TO_CROSS"
+            and i["time"] > last_instr["time"]
+            and i["reference"].strip() == hold_ref
+        ]
+        self.logger.debug(
+            f"CLEARED_TO_CROSS found={len(cleared)} for {hold_ref} after hold time={last_instr['time']}"
+        )
+        if cleared or not hold_ref:
+            return None
+        return last_instr, hold_ref
+
+    def _violation(self, plane, last_instr, hold_ref, current_time, current_lat, current_lon, speed, bearing):
+        """Builds the violation record for a plane crossing into a held feature."""
+        violation_msg = (
+            f"Non-compliant: {plane} violated {last_instr['instr']} at {hold_ref} "
+            f"after it was issued (no CLEAR_TO_CROSS)."
+        )
+        recommendation = self.recommend_action(violation_msg)
+        return {
+            "message": violation_msg,
+            "ref": hold_ref,
+            "timestamp": current_time,
+            "lat": current_lat,
+            "lon": current_lon,
+            "speed": speed,
+            "heading": bearing,
+            "interval": self.interval,
+            "prediction": recommendation["prediction"],
+            "advisory": recommendation["advisory"]
+        }
+
     def evaluate_compliance(self,
                             plane: str,
                             prev_lat: float,
@@ -122,7 +258,8 @@ class Flights:
                             bearing: float,
                             static_features: List[gpd.GeoDataFrame],
                             current_time: float,
-                            instructions: List[Dict]) -> Dict[str, str]:
+                            instructions: List[Dict],
+                            timeline: tuple = None) -> Dict[str, str]:
         """
         Checks:
             If there's a HOLD_SHORT / HOLD_POSITION in effect, ensure no crossing occurs
@@ -130,6 +267,9 @@ class Flights:
 
         We now form a line from the real flight path (current → predicted). If that line
         intersects the relevant geometry (and no clearance was given), we flag it.
+
+        timeline is this plane's entry from build_instruction_index; callers checking
+        many fixes should pass it so the instructions are not re-indexed on every call.
         """
         logger = self.logger
         logger.debug(f"evaluate_compliance called for plane={plane} at time={current_time}")
@@ -138,131 +278,162 @@ class Flights:
         flight_line = LineString([(current_lon, current_lat), (prev_lon, prev_lat)])
 
         # 1) Check if plane has a HOLD_POSITION or HOLD_SHORT instruction in effect
-        relevant_instr = [
-            i for i in instructions
-            if self.map_flight_identifier(i["plane"]) == plane and i["time"] <= current_time
-        ]
-        relevant_instr.sort(key=lambda x: x["time"])
-        logger.debug(f"relevant_instr found = {len(relevant_instr)} up to current_time={current_time}")
-        if relevant_instr:
-            last_instr = relevant_instr[-1]
-            logger.debug(f"last_instr for plane={plane} is {last_instr}")
-            hold_commands = {"HOLD_POSITION", "HOLD_SHORT"}
-            if last_instr["instr"] in hold_commands:
-                hold_ref = last_instr["reference"].strip()
-                logger.debug(f"Detected hold instruction {last_instr['instr']} for reference={hold_ref}")
-                cleared = [
-                    i for i in instructions
-                    if self.map_flight_identifier(i["plane"]) == plane
-                    and i["instr"] == "CLEAR_TO_CROSS"
-                    and i["time"] > last_instr["time"]
-                    and i["time"] <= current_time
-                    and i["reference"].strip() == hold_ref
-                ]
-                logger.debug(
-                    f"CLEARED_TO_CROSS found={len(cleared)} for {hold_ref} after hold time={last_instr['time']}"
+        if timeline is None:
+            timeline = build_instruction_index(instructions).get(plane, ([], []))
+        times, plane_instr = timeline
+        # Instructions issued up to current_time: a prefix of the time-sorted timeline
+        hold = self._active_hold(plane_instr, bisect_right(times, current_time))
+        if hold is not None:
+            last_instr, hold_ref = hold
+            feature_geom = self.get_hold_zone(hold_ref, static_features)
+            if (feature_geom is not None
+                    and _bbox_overlaps(self._hold_zone_bounds[hold_ref],
+                                       min(current_lon, prev_lon), min(current_lat, prev_lat),
+                                       max(current_lon, prev_lon), max(current_lat, prev_lat))
+                    and feature_geom.intersects(flight_line)):
+                logger.debug(f"HOLD violation detected for plane={plane} on {hold_ref}")
+                return self._violation(
+                    plane, last_instr, hold_ref, current_time, current_lat, current_lon, speed, bearing
                 )
-                if not cleared and hold_ref:
-                    feature_geom = self.get_feature_geometry(hold_ref, static_features)
-                    feature_geom = feature_geom.buffer(40)
-                    if feature_geom is not None and flight_line.intersects(feature_geom):
-                        logger.debug(f"HOLD violation detected for plane={plane} on {hold_ref}")
-                        violation_msg = (
-                            f"Non-compliant: {plane} violated {last_instr['instr']} at {hold_ref} "
-                            f"after it was issued (no CLEAR_TO_CROSS)."
-                        )
-                        recommendation = self.recommend_action(violation_msg)
-                        return {
-                            "message": violation_msg,
-                            "ref": hold_ref,
-                            "timestamp": current_time,
-                            "lat": current_lat,
-                            "lon": current_lon,
-                            "speed": speed,
-                            "heading": bearing,
-                            "interval": self.interval,
-                            "prediction": recommendation["prediction"],
-                            "advisory": recommendation["advisory"]
-                        }
 
         logger.debug("No compliance violations detected.")
         return {"message": "In compliance", "ref": ""}
 
+    def evaluate_compliance_batch(self,
+                                  plane: str,
+                                  prev_lats, prev_lons,
+                                  current_lats, current_lons,
+                                  speeds, bearings,
+                                  static_features: List[gpd.GeoDataFrame],
+                                  current_times,
+                                  timeline: tuple) -> List[tuple]:
+        """
+        evaluate_compliance over a whole run of fixes at once. Returns (row, result) for
+        each violating row, in row order. Rows are grouped by the instruction in effect,
+        and each held feature is tested against all of its rows' flight lines in one
+        vectorized intersects call. Values in the results come straight from the inputs,
+        so pass plain lists to get plain floats back.
+        """
+        times, plane_instr = timeline
+        issued = np.searchsorted(np.asarray(times, dtype=np.float64), current_times, side="right")
+        # (rows, 2 points, lon/lat): current (predicted) point first, as in evaluate_compliance
+        coords = np.stack([
+            np.column_stack([current_lons, current_lats]),
+            np.column_stack([prev_lons, prev_lats]),
+        ], axis=1)
+        line_min, line_max = coords.min(axis=1), coords.max(axis=1)
+
+        violations = []
+        for count in np.unique(issued):
+            hold = self._active_hold(plane_instr, int(count))
+            if hold is None:
+                continue
+            last_instr, hold_ref = hold
+            zone = self.get_hold_zone(hold_ref, static_features)
+            if zone is None:
+                continue
+            # Only rows whose line's bounding box reaches the zone's go on to GEOS
+            minx, miny, maxx, maxy = self._hold_zone_bounds[hold_ref]
+            rows = np.flatnonzero(
+                (issued == count)
+                & (line_max[:, 0] >= minx) & (line_min[:, 0] <= maxx)
+                & (line_max[:, 1] >= miny) & (line_min[:, 1] <= maxy)
+            )
+            hit_rows = rows[shapely.intersects(zone, shapely.linestrings(coords[rows]))]
+            for row in hit_rows.tolist():
+                violations.append((row, self._violation(
+                    plane, last_instr, hold_ref, current_times[row],
+                    current_lats[row], current_lons[row], speeds[row], bearings[row]
+                )))
+        violations.sort(key=lambda v: v[0])
+        return violations
+
+    def _scan_tail(self,
+                   tail: str,
+                   track: Dict[str, np.ndarray],
+                   instructions: List[Dict],
+                   static_features: List[gpd.GeoDataFrame]) -> List[tuple]:
+        """
+        Scans one plane's history (a dict of column arrays) and returns (result, dt_sec)
+        for the first violation of each ref, in the order they occur.
+        """
+        logger = self.logger
+        logger.debug(f"Processing plane={tail} with {len(track['Timestamp'])} records.")
+
+        timeline = build_instruction_index(instructions).get(tail, ([], []))
+
+        lats, lons = track["lat"], track["lon"]
+        headings, speeds = track["Direction"], track["Speed"]
+
+        # Project every fix ahead in one vectorized pass; only the furthest horizon is checked.
+        time_ahead_intervals = [5, 10, 15, 20, 25, 30]  # Seconds into the future
+        dt_sec = time_ahead_intervals[-1]
+        pred_lats, pred_lons = project_position_vec(lats, lons, headings, speeds, dt_sec)
+        check_times = [t + (dt_sec*0.8) for t in track["Timestamp"].tolist()]
+
+        # The first fix only seeds the track; checks start from the second one
+        violations = self.evaluate_compliance_batch(
+            tail,
+            lats.tolist()[1:], lons.tolist()[1:],
+            pred_lats.tolist()[1:], pred_lons.tolist()[1:],
+            speeds.tolist()[1:], headings.tolist()[1:],
+            static_features,
+            check_times[1:],
+            timeline
+        )
+
+        hits = []
+        seen_refs = set()
+        for _, result in violations:
+            if result["ref"] not in seen_refs:
+                seen_refs.add(result["ref"])
+                hits.append((result, dt_sec))
+        return hits
+
     def log_flagged_incursions(self,
-                               plane_histories: Dict[str, pd.DataFrame],
+                               plane_histories: Dict[str, Dict[str, np.ndarray]],
                                instructions: List[Dict],
                                static_features: List[gpd.GeoDataFrame],
                                interval: int = 5) -> List[Dict]:
         """
-        Iterates through flight history (for all planes).
+        Iterates through flight history (for all planes), each given as a dict of
+        column arrays (lat, lon, Direction, Speed, Timestamp).
         For each record, we now consider the line from the current record
         to the predicted record. If the line intersects a geometry that should 
         not be crossed, logs a violation.
+
+        Each plane's history is scanned in one batched pass; results are merged in plane order.
         """
         logger = self.logger
         self.interval = interval
         logger.debug("log_flagged_incursions called.")
 
-        events = []
-        for tail, df in plane_histories.items():
-            logger.debug(f"Processing plane={tail} with {len(df)} records.")
-            
-            prev_row = None
-            pred_lat, pred_lon = None, None
-
-            for _, row in df.iterrows():
-                if prev_row is None:
-                    # For the first row, initialize predicted positions with actual values
-                    pred_lat, pred_lon = row["lat"], row["lon"]
-                    prev_row = row
-                    continue
-
-                # Compute predicted positions based on previous prediction
-                time_ahead_intervals = [5, 10, 15, 20, 25, 30]  # Seconds into the future
-                current_lat, current_lon = row["lat"], row["lon"]
-                
-                for dt_sec in time_ahead_intervals:
-                    pred_lat, pred_lon = self.project_position(
-                        lat=current_lat,
-                        lon=current_lon,
-                        heading_deg=row["Direction"],
-                        speed=row["Speed"],
-                        dt_sec=dt_sec
-                    )
-
-                # Evaluate compliance using predicted positions
-                result = self.evaluate_compliance(
-                    plane=tail,
-                    prev_lat=current_lat,
-                    prev_lon=current_lon,
-                    current_lat=pred_lat,
-                    current_lon=pred_lon,
-                    speed=row["Speed"],
-                    bearing=row["Direction"],
-                    static_features=static_features,
-                    current_time=row["Timestamp"] + (dt_sec*0.8),
-                    instructions=instructions
-                )
+        per_tail_hits = [
+            self._scan_tail(tail, track, instructions, static_features)
+            for tail, track in plane_histories.items()
+        ]
 
-                if "Non-compliant" in result["message"]:
-                    key = (tail, result["ref"])
-                    if key not in self.FLAGGED_INCURSIONS:
-                        self.FLAGGED_INCURSIONS[key] = {
-                            "tail": tail,
-                            "timestamp": result["timestamp"],
-                            "lat": result["lat"],
-                            "lon": result["lon"],
-                            "message": result["message"],
-                            "ref": result["ref"],
-                            "speed": result["speed"],
-                            "heading": result["heading"],
-                            "interval": result["interval"],
-                            "prediction": result["prediction"],
-                            "advisory": result["advisory"]
-                        }
-                        print(f"[EARLY WARNING] {tail}: {result['message']} at t+{dt_sec}s")
-                        events.append(self.FLAGGED_INCURSIONS[key])
-
-                prev_row = row  # Update for next iteration
+        # Only the first violation per (plane, ref) is reported
+        events = []
+        seen = set()
+        for tail, hits in zip(plane_histories, per_tail_hits):
+            for result, dt_sec in hits:
+                key = (tail, result["ref"])
+                if key not in seen:
+                    seen.add(key)
+                    events.append({
+                        "tail": tail,
+                        "timestamp": result["timestamp"],
+                        "lat": result["lat"],
+                        "lon": result["lon"],
+                        "message": result["message"],
+                        "ref": result["ref"],
+                        "speed": result["speed"],
+                        "heading": result["heading"],
+                        "interval": result["interval"],
+                        "prediction": result["prediction"],
+                        "advisory": result["advisory"]
+                    })
+                    print(f"[EARLY WARNING] {tail}: {result['message']} at t+{dt_sec}s")
         logger.debug("log_flagged_incursions completed.")
-        return events
\ No newline at end of file
+        return events
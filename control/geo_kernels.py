@@ -0,0 +1,26 @@
+import math
+from numba import njit
+
+EARTH_RADIUS_M = 6371000.0
+
+@njit(cache=True, fastmath=True)
+def forward_geodesic(lat, lon, heading_deg, speed, dt_sec, out_lat, out_lon):
+    """
+    Spherical forward geodesic: writes the position reached after moving speed*dt_sec
+    meters along heading_deg from each (lat, lon) into out_lat/out_lon. One fused loop,
+    so no temporary arrays are allocated for the intermediate trig terms.
+    """
+    deg2rad = math.pi / 180.0
+    rad2deg = 180.0 / math.pi
+    for i in range(lat.size):
+        angular = speed[i] * dt_sec / EARTH_RADIUS_M
+        heading_rad = heading_deg[i] * deg2rad
+        lat_rad = lat[i] * deg2rad
+        sin_lat, cos_lat = math.sin(lat_rad), math.cos(lat_rad)
+        sin_ang, cos_ang = math.sin(angular), math.cos(angular)
+        new_lat_rad = math.asin(sin_lat * cos_ang + cos_lat * sin_ang * math.cos(heading_rad))
+        out_lat[i] = new_lat_rad * rad2deg
+        out_lon[i] = lon[i] + rad2deg * math.atan2(
+            math.sin(heading_rad) * sin_ang * cos_lat,
+            cos_ang - sin_lat * math.sin(new_lat_rad)
+        )
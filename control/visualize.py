@@ -1,26 +1,54 @@
 import folium
 import geopandas as gpd
-import pandas as pd
-import json
+import numpy as np
+import orjson
+import shapely
+import zlib
 
 from folium.plugins import MousePosition
 from folium.elements import Element
 from typing import List, Dict
 
-# Global plane color mapping and palette with better contrasting colors
-PLANE_COLORS = {}
+# Plane color palette with better contrasting colors
 COLOR_PALETTE = [
     "#1f77b4", "#2ca02c", "#d62728", "#9467bd",
     "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
     "#aec7e8", "#ffbb78", "#98df8a", "#ff9896"
 ]
 
+# Properties kept when serializing the runway/taxiway layers (tooltip fields + style class)
+FEATURE_LAYER_PROPERTIES = ["ref", "name", "class"]
+
 def get_plane_color(tail: str) -> str:
-    """Assigns a unique color to each plane based on its tail number."""
-    if tail not in PLANE_COLORS:
-        index = len(PLANE_COLORS) % len(COLOR_PALETTE)
-        PLANE_COLORS[tail] = COLOR_PALETTE[index]
-    return PLANE_COLORS[tail]
+    """
+    Assigns a color to each plane from a CRC32 of its tail number: the same tail always
+    gets the same color, across runs and processes, with no shared state.
+    """
+    return COLOR_PALETTE[zlib.crc32(tail.encode()) % len(COLOR_PALETTE)]
+
+# Leaflet style per feature class; the combined runway/taxiway layer dispatches on the class property
+FEATURE_STYLES = {
+    "runway": {'color': '#ff7700', 'weight': 3, 'fillOpacity': 0.3, 'fillColor': '#ffaa00'},
+    "taxiway": {'color': '#95c5e8', 'weight': 2, 'fillOpacity': 0.2, 'fillColor': '#c7e1f6'},
+}
+
+def feature_collection_json(layers: List[gpd.GeoDataFrame]) -> str:
+    """
+    Serializes the feature layers into one GeoJSON FeatureCollection string. Each feature keeps
+    the FEATURE_LAYER_PROPERTIES columns, including the "class" tag set by features.py.
+    Geometries are written by GEOS in one shapely.to_geojson call per layer and properties by
+    orjson, so no per-feature dicts of coordinates are built in Python.
+    """
+    features = []
+    for layer in layers:
+        geometries = shapely.to_geojson(layer.geometry.values).tolist()
+        properties = zip(*(layer[column].tolist() for column in FEATURE_LAYER_PROPERTIES))
+        features.extend(
+            '{"type":"Feature","properties":%s,"geometry":%s}'
+            % (orjson.dumps(dict(zip(FEATURE_LAYER_PROPERTIES, values))).decode(), geometry)
+            for values, geometry in zip(properties, geometries)
+        )
+    return '{"type":"FeatureCollection","features":[' + ",".join(features) + ']}'
 
 def build_custom_js(m: folium.Map, flights, violations):
     """
@@ -505,12 +533,13 @@ def build_custom_js(m: folium.Map, flights, violations):
 
 def build_animated_map(center_lat: float, center_lon: float,
                        static_features: List[gpd.GeoDataFrame],
-                       plane_histories: Dict[str, pd.DataFrame],
+                       plane_histories: Dict[str, Dict[str, np.ndarray]],
                        flagged_events: List[Dict],
                        animation_speed: float = 1.0) -> folium.Map:
     """
     Constructs an interactive Folium map with improved performance
     and visual display of flight paths and runway incursions.
+    Each plane's history is a dict of column arrays (lat, lon, Speed, Direction, Timestamp).
     """
     # Create the base Folium map
     m = folium.Map(
@@ -529,39 +558,17 @@ def build_animated_map(center_lat: float, center_lon: float,
         lng_formatter="function(num) {return L.Util.formatNum(num, 5);}"
     ).add_to(m)
 
-    # Add static features: runways & taxiways
+    # Add static features: runways & taxiways as one layer, handed to folium as a ready-made
+    # GeoJSON string carrying only the properties the tooltips and styling need.
     runways, taxiways = static_features
-    if not runways.empty:
-        folium.GeoJson(
-            runways.__geo_interface__,
-            name="Runways",
-            style_function=lambda f: {
-                'color': '#ff7700', 
-                'weight': 3, 
-                'fillOpacity': 0.3,
-                'fillColor': '#ffaa00'
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=["ref", "name"], 
-                aliases=["Runway", "Name"], 
-                localize=True,
-                sticky=True
-            )
-        ).add_to(m)
-    
-    if not taxiways.empty:
+    if not (runways.empty and taxiways.empty):
         folium.GeoJson(
-            taxiways.__geo_interface__,
-            name="Taxiways",
-            style_function=lambda f: {
-                'color': '#95c5e8', 
-                'weight': 2, 
-                'fillOpacity': 0.2,
-                'fillColor': '#c7e1f6'
-            },
+            feature_collection_json(static_features),
+            name="Runways & Taxiways",
+            style_function=lambda f: FEATURE_STYLES[f['properties']['class']],
             tooltip=folium.GeoJsonTooltip(
-                fields=["ref", "name"], 
-                aliases=["Taxiway", "Name"], 
+                fields=["ref", "name", "class"], 
+                aliases=["Ref", "Name", "Type"], 
                 localize=True,
                 sticky=True
             )
@@ -569,23 +576,32 @@ def build_animated_map(center_lat: float, center_lon: float,
 
     # Prepare flight data for animation
     flight_data_js = []
-    for tail, df in plane_histories.items():
-        df_sorted = df.sort_values("Timestamp")
-        points_list = []
-        
-        for _, row in df_sorted.iterrows():
-            lat = row["lat"]
-            lon = row["lon"]
-            speed = row.get("Speed", 0)
-            bearing = row.get("Direction", 0)
-            timestamp = row["Timestamp"]
-            points_list.append({
+    for tail, track in plane_histories.items():
+        timestamps = track["Timestamp"]
+        n = len(timestamps)
+        # Histories arrive sorted from the tracker; only re-sort if a caller passed one that isn't.
+        if np.all(timestamps[1:] >= timestamps[:-1]):
+            track_sorted = track
+        else:
+            order = np.argsort(timestamps, kind="stable")
+            track_sorted = {col: values[order] for col, values in track.items()}
+        # Column lists zipped together instead of iterrows, which builds a Series per row
+        points_list = [
+            {
                 "lat": lat,
                 "lon": lon,
                 "speed": speed,
                 "heading": bearing,
                 "timestamp": timestamp
-            })
+            }
+            for lat, lon, speed, bearing, timestamp in zip(
+                track_sorted["lat"].tolist(),
+                track_sorted["lon"].tolist(),
+                track_sorted["Speed"].tolist() if "Speed" in track_sorted else [0] * n,
+                track_sorted["Direction"].tolist() if "Direction" in track_sorted else [0] * n,
+                track_sorted["Timestamp"].tolist(),
+            )
+        ]
         
         flight_dict = {
             "tail": tail,
@@ -606,9 +622,11 @@ def build_animated_map(center_lat: float, center_lon: float,
             "prediction": ev["prediction"]
         }
 
-    # Convert to JSON for embedding in JS
-    flight_data_json = json.dumps(flight_data_js)
-    violations_json = json.dumps(violations_by_time)
+    # Convert to JSON for embedding in JS (orjson: compiled encoder, handles NumPy scalars
+    # and the float timestamp keys directly)
+    json_opts = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    flight_data_json = orjson.dumps(flight_data_js, option=json_opts).decode()
+    violations_json = orjson.dumps(violations_by_time, option=json_opts).decode()
 
     # Calculate animation interval based on speed
     animation_interval = int(50 / animation_speed)  # 50ms base / speed modifier
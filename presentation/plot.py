@@ -27,21 +27,22 @@ delta_v = np.array([plane_speed, 0]) - missile_speed * delta_pos / np.linalg.nor
 t_intercept = np.linalg.norm(delta_pos) / np.linalg.norm(delta_v)
 intercept_point = plane_pos + t_intercept * np.array([plane_speed, 0])
 
+# Plane shape (simplified for top-down view), centred on the origin
+PLANE_VERTICES = np.array([
+    [2, 0],    # Nose
+    [0, 1],    # Right wing tip
+    [-1, 0.5], # Right wing back
+    [-1, 0.2], # Body right
+    [-1.5, 0], # Tail
+    [-1, -0.2],# Body left
+    [-1, -0.5],# Left wing back
+    [0, -1],   # Left wing tip
+])
+
 # Create the objects - now with just black outlines, no fill
 def create_plane(pos, scale=0.5):
-    # Plane shape (simplified for top-down view)
-    plane_vertices = scale * np.array([
-        [2, 0],    # Nose
-        [0, 1],    # Right wing tip
-        [-1, 0.5], # Right wing back
-        [-1, 0.2], # Body right
-        [-1.5, 0], # Tail
-        [-1, -0.2],# Body left
-        [-1, -0.5],# Left wing back
-        [0, -1],   # Left wing tip
-    ])
     # Shift to position
-    plane_vertices = plane_vertices + pos.reshape(1, 2)
+    plane_vertices = scale * PLANE_VERTICES + pos.reshape(1, 2)
     return Polygon(plane_vertices, closed=True, fc='none', ec='black', 
                    lw=1.5, zorder=3)
 
@@ -61,30 +62,26 @@ missile = create_missile(missile_pos)
 ax.add_patch(plane)
 ax.add_patch(missile)
 
+# Total frames for 6 seconds at 20 fps = 120 frames
+FPS = 20
+TOTAL_FRAMES = 120
+IMPACT_FRAME = 100  # Impact at 5 seconds
+
+# Every frame's positions are fixed up front, so precompute them once; update() only indexes.
+progress = np.arange(IMPACT_FRAME)[:, None] / IMPACT_FRAME
+plane_positions = plane_pos + progress * (intercept_point - plane_pos)
+missile_positions = missile_pos + progress * (intercept_point - missile_pos)
+plane_base_vertices = plane.get_xy() - plane_pos
+# Remaining time to impact (fixed at 6 seconds total animation), 5 seconds until impact at frame 100
+timer_labels = [f"T-{5 - frame / FPS:.1f}s" for frame in range(IMPACT_FRAME)]
+
 # Animation update function
 def update(frame):
-    # Total frames for 6 seconds at 20 fps = 120 frames
-    total_frames = 120
-    impact_frame = 100  # Impact at 5 seconds
-    
-    if frame < impact_frame:
+    if frame < IMPACT_FRAME:
         # Approach phase
-        progress = frame / impact_frame
-        current_plane_pos = plane_pos + progress * (intercept_point - plane_pos)
-        
-        # Calculate missile position for this frame (leading to interception)
-        missile_direction = (intercept_point - missile_pos) / np.linalg.norm(intercept_point - missile_pos)
-        distance_covered = progress * np.linalg.norm(intercept_point - missile_pos)
-        current_missile_pos = missile_pos + missile_direction * distance_covered
-        
-        # Update positions
-        plane.set_xy(create_plane(current_plane_pos).get_xy())
-        missile.set_center(current_missile_pos)
-        
-        # Calculate remaining time to impact (fixed at 6 seconds total animation)
-        remaining_time = 5 - (frame / 20)  # 5 seconds until impact at frame 100
-        timer_text.set_text(f"T-{remaining_time:.1f}s")
-        
+        plane.set_xy(plane_base_vertices + plane_positions[frame])
+        missile.set_center(missile_positions[frame])
+        timer_text.set_text(timer_labels[frame])
     else:
         # After impact - everything vanishes
         plane.set_alpha(0)
@@ -94,9 +91,10 @@ def update(frame):
     return plane, missile, timer_text
 
 # Create animation - 6 seconds at 20fps = 120 frames
-animation = FuncAnimation(fig, update, frames=120, interval=50, blit=True)
+animation = FuncAnimation(fig, update, frames=TOTAL_FRAMES, interval=1000 // FPS, blit=True,
+                          cache_frame_data=False)
 
 from matplotlib.animation import PillowWriter
-animation.save('plane_missile_collision.gif', writer=PillowWriter(fps=20))
+animation.save('plane_missile_collision.gif', writer=PillowWriter(fps=FPS))
 
 plt.show()